@@ -4,40 +4,43 @@ import time
 
 from timeit_decorator import timeit
 
+_randint = random.Random(0).randint
+_sleep = time.sleep
+
 
 class TimeItTestClass:
 
     @timeit(detailed=True, log_level=None)
     def timeit_detailed(self, a: int, b: int = 2):
-        time.sleep(random.randint(a, b))
+        _sleep(_randint(a, b))
 
     @timeit(log_level=None)
     def timeit_simple(self, a: int, b: int = 2):
-        time.sleep(random.randint(a, b))
+        _sleep(_randint(a, b))
 
     @timeit(detailed=True, log_level=logging.INFO)
     def timeit_detailed_logged(self, a: int, b: int = 2):
-        time.sleep(random.randint(a, b))
+        _sleep(_randint(a, b))
 
     @timeit(log_level=logging.INFO)
     def timeit_simple_logged(self, a: int, b: int = 2):
-        time.sleep(random.randint(a, b))
+        _sleep(_randint(a, b))
 
     @timeit(log_level=None, use_multiprocessing=True, runs=5, workers=5)
     def timeit_multiprocessing(self, a: int, b: int = 2):
-        time.sleep(random.randint(a, b))
+        _sleep(_randint(a, b))
 
     @timeit(log_level=None, runs=5, workers=5)
     def timeit_multithreading(self, a: int, b: int = 2):
-        time.sleep(random.randint(a, b))
+        _sleep(_randint(a, b))
 
     @timeit(log_level=None, use_multiprocessing=True, runs=5, workers=5, detailed=True)
     def timeit_multiprocessing_detailed(self, a: int, b: int = 2):
-        time.sleep(random.randint(a, b))
+        _sleep(_randint(a, b))
 
     @timeit(log_level=None, runs=5, workers=5, detailed=True)
     def timeit_multithreading_detailed(self, a: int, b: int = 2):
-        time.sleep(random.randint(a, b))
+        _sleep(_randint(a, b))
 
     @timeit(log_level=logging.INFO, runs=5, workers=5)
     def test_function(self, a: int, b: int = 2):
@@ -0,0 +1,5 @@
+def pytest_configure(config):
+    # Registered here so the marker is known even when pytest-xdist is not installed
+    config.addinivalue_line(
+        "markers", "xdist_group(name): run all tests of the group on the same pytest-xdist worker"
+    )
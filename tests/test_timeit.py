@@ -1,24 +1,40 @@
+import array
+import importlib
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import re
+import statistics
+import subprocess
+import sys
+import threading
 import unittest
 import time
 
 import pytest
 
 from timeit_decorator import timeit
+from timeit_decorator.timeit import _summarize, _timeit_worker, _warn_if_gil_bound
 
 
 def cpu_bound_function(n):
-    # Simulating a CPU-bound task
-    for _ in range(1000000):
-        n += 1
-    return n
+    # Simulating a CPU-bound task, the loop runs in C rather than in the interpreter
+    return n + sum(itertools.repeat(1, 1000000))
 
 
 def cpu_intensive_task():
     # Simulating a CPU-intensive task
-    total = 0
-    for i in range(1000000):
-        total += i
-    return total
+    return sum(range(1000000))
+
+
+def _tiny_work():
+    # Short deterministic stand-in for I/O, so the tests measure the decorator rather than the sleeper.
+    # sleep(0) yields the GIL on every iteration, letting worker threads overlap as real I/O would.
+    deadline = time.monotonic() + 0.005
+    while time.monotonic() < deadline:
+        time.sleep(0)
 
 
 def task_with_multiprocessing(n):
@@ -31,34 +47,19 @@ def task_with_threading(n):
     return "thread"
 
 
-@timeit(runs=3, workers=3)
-def multiple_workers_multiple_runs(n: float):
-    time.sleep(n)
-    return n
-
-
-@timeit(runs=3)
-def single_worker_multiple_runs(n: float):
-    time.sleep(n)
-    return n
-
-
-@timeit(workers=3)
-def multiple_workers_single_run(n: float):
-    time.sleep(n)
+def work_and_return(n: float):
+    _tiny_work()
     return n
 
 
-@timeit()
-def single_worker_single_run(n: float):
+def sleep_and_return(n: float):
     time.sleep(n)
     return n
 
 
-@timeit(runs=2, workers=2)
 def io_bound_function(n):
     # Simulating an I/O-bound task
-    time.sleep(n)
+    _tiny_work()
     return n
 
 
@@ -67,46 +68,68 @@ def sample_function(a, b):
     return a + b
 
 
+def _run_python(code, *paths):
+    # Runs in a fresh interpreter that imports this checkout of the package, and modules from paths
+    package_file = importlib.import_module("timeit_decorator").__file__
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(package_file)))
+    return subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join((package_root, *map(str, paths)))},
+    )
+
+
+_CONFIG = {"value": 1}
+
+
+def read_config():
+    return _CONFIG["value"]
+
+
 class SampleClass:
     @staticmethod
     @timeit(use_multiprocessing=False, runs=2, workers=2)
     def sample_static_method(a, b):
-        time.sleep(0.1)
+        _tiny_work()
         return a + b
 
     @classmethod
     @timeit(use_multiprocessing=True, runs=2, workers=2)
     def sample_class_method(cls, a, b):
-        time.sleep(0.1)
+        _tiny_work()
         return a + b
 
     @timeit(use_multiprocessing=True, runs=2, workers=2)
     def sample_instance_method(self, a, b):
-        time.sleep(0.1)
+        _tiny_work()
         return a + b
 
 
 def test_multiple_workers_multiple_runs():
+    multiple_workers_multiple_runs = timeit(runs=3, workers=3)(work_and_return)
     result = multiple_workers_multiple_runs(0.1)
     assert result == 0.1
 
 
 def test_single_worker_multiple_runs():
+    single_worker_multiple_runs = timeit(runs=3)(work_and_return)
     result = single_worker_multiple_runs(0.1)
     assert result == 0.1
 
 
 def test_multiple_workers_single_run():
+    multiple_workers_single_run = timeit(workers=3)(sleep_and_return)
     result = multiple_workers_single_run(0.1)
     assert result == 0.1
 
 
 def test_single_worker_single_run():
+    single_worker_single_run = timeit()(sleep_and_return)
     result = single_worker_single_run(0.1)
     assert result == 0.1
 
 
 def test_timing_accuracy():
+    single_worker_single_run = timeit()(sleep_and_return)
     start_time = time.time()
     single_worker_single_run(0.1)
     end_time = time.time()
@@ -115,6 +138,9 @@ def test_timing_accuracy():
 
 
 def test_concurrency_effectiveness():
+    single_worker_multiple_runs = timeit(runs=3)(work_and_return)
+    multiple_workers_multiple_runs = timeit(runs=3, workers=3)(work_and_return)
+
     single_start_time = time.time()
     single_worker_multiple_runs(0.1)
     single_end_time = time.time()
@@ -135,7 +161,153 @@ def test_error_handling():
         error_function()
 
 
+def test_disabled_logging_returns_result_without_output(caplog):
+    @timeit(runs=2, workers=2, detailed=True)
+    def test_func():
+        return "quiet"
+
+    logging.disable(logging.INFO)
+    try:
+        assert test_func() == "quiet"
+    finally:
+        logging.disable(logging.NOTSET)
+    assert not caplog.records
+
+
+def test_detailed_output_formats_times_consistently(capsys):
+    single_run = timeit(detailed=True, log_level=None)(sample_function)
+    multiple_runs = timeit(runs=2, workers=2, detailed=True, log_level=None)(sample_function)
+
+    assert single_run(1, 2) == 3
+    assert multiple_runs(1, 2) == 3
+
+    output = capsys.readouterr().out
+    assert re.search(r"Execution Time +\d+\.\d{6}s", output)
+    for label in ("Average Time", "Median Time", "Min Time", "Max Time", "Std Deviation", "Total Time"):
+        assert re.search(label + r" +\d+\.\d{6}s", output)
+
+
+def test_json_log_format(capsys):
+    decorated_func = timeit(runs=2, workers=2, log_level=None, log_format="json")(sample_function)
+    assert decorated_func(1, 2) == 3
+
+    record = json.loads(capsys.readouterr().out)
+    assert record["function"] == "sample_function"
+    assert record["args"] == [1, 2]
+    assert record["runs"] == 2
+    assert record["workers"] == 2
+    assert record["min_time"] <= record["median_time"] <= record["max_time"]
+
+
+def test_json_log_format_omits_method_instance(capsys):
+    class Adder:
+        @timeit(log_level=None, log_format="json")
+        def add(self, a, b):
+            return a + b
+
+    assert Adder().add(1, 2) == 3
+    assert json.loads(capsys.readouterr().out)["args"] == [1, 2]
+
+
+def test_unknown_log_format():
+    decorated_func = timeit(log_format="xml")(sample_function)
+    with pytest.raises(ValueError):
+        decorated_func(1, 2)
+
+
+@pytest.mark.xdist_group("multiprocessing")
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="fork is not available")
+def test_multiprocessing_sees_current_globals(monkeypatch):
+    decorated_func = timeit(runs=2, workers=2, use_multiprocessing=True, mp_context="fork")(read_config)
+    assert decorated_func() == 1
+    monkeypatch.setitem(_CONFIG, "value", 2)
+    assert decorated_func() == 2
+
+
+def test_import_leaves_start_method_unset():
+    # Pretend to be on macOS, where the platform default context is used
+    code = (
+        "import sys; sys.platform = 'darwin'\n"
+        "import multiprocessing, timeit_decorator\n"
+        "multiprocessing.set_start_method('spawn')\n"
+    )
+    _run_python(code)
+
+
+@pytest.mark.xdist_group("multiprocessing")
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="fork is only used by default on Linux")
+def test_start_method_set_by_program_is_used(tmp_path):
+    # Spawned workers have to import the timed function, so it lives in a module of its own
+    (tmp_path / "process_kind.py").write_text(
+        "import multiprocessing\n\n\n"
+        "def process_kind():\n"
+        "    return type(multiprocessing.current_process()).__name__\n"
+    )
+    code = (
+        "import multiprocessing\n"
+        "from timeit_decorator import timeit\n"
+        "from process_kind import process_kind\n"
+        "multiprocessing.set_start_method('spawn')\n"
+        "print(timeit(runs=2, workers=2, use_multiprocessing=True, log_level=None)(process_kind)())\n"
+    )
+    assert _run_python(code, tmp_path).stdout.splitlines()[-1] == "SpawnProcess"
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="os.fork is not available")
+def test_reports_in_process_forked_after_import():
+    # Pre-fork servers import the application, then fork the processes that handle the calls
+    code = (
+        "import os, time\n"
+        "from timeit_decorator import timeit\n"
+        "pid = os.fork()\n"
+        "if pid == 0:\n"
+        "    timeit(log_level=None)(time.sleep)(0)\n"
+        "    os._exit(0)\n"
+        "os.waitpid(pid, 0)\n"
+    )
+    assert "Exec:" in _run_python(code).stdout
+
+
+def test_unknown_mp_context():
+    decorated_func = timeit(runs=2, workers=2, use_multiprocessing=True, mp_context="thread")(sample_function)
+    with pytest.raises(ValueError):
+        decorated_func(1, 2)
+
+
+@pytest.mark.xdist_group("multiprocessing")
+def test_multiprocessing_with_spawn_context():
+    decorated_func = timeit(runs=2, workers=2, use_multiprocessing=True, mp_context="spawn")(sample_function)
+    assert decorated_func(1, 2) == 3
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+@pytest.mark.parametrize("times", [
+    [0.5],
+    [0.3, 0.1],
+    [0.2, 0.4, 0.1, 0.3, 0.25],
+    [(i * 37 % 101) / 1000 for i in range(100)],
+    [(i * 37 % 101) / 1000 for i in range(101)],
+])
+@pytest.mark.parametrize("container", [list, lambda values: array.array("d", values)])
+def test_summarize_matches_statistics(times, use_numpy, container, monkeypatch):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        # The package re-exports the decorator under the module's name, so fetch the module itself
+        monkeypatch.setattr(importlib.import_module("timeit_decorator.timeit"), "_import_numpy", lambda: None)
+
+    avg_time, med_time, min_time, max_time, std_dev, total_time = _summarize(container(times))
+
+    assert avg_time == pytest.approx(statistics.mean(times))
+    assert med_time == pytest.approx(statistics.median(times))
+    assert min_time == min(times)
+    assert max_time == max(times)
+    assert std_dev == pytest.approx(statistics.stdev(times) if len(times) > 1 else 0)
+    assert total_time == pytest.approx(sum(times))
+
+
 def test_return_values_consistency():
+    multiple_workers_multiple_runs = timeit(runs=3, workers=3)(work_and_return)
     results = [multiple_workers_multiple_runs(0.1) for _ in range(5)]
     assert all(result == 0.1 for result in results)
 
@@ -190,14 +362,55 @@ def test_zero_time_execution():
 
 
 def test_function_with_multiple_return_values():
+    counter = itertools.count(1)
+
     @timeit(runs=3)
-    def varying_return_func(call_count=[0]):
-        call_count[0] += 1
-        return call_count[0]
+    def varying_return_func():
+        return next(counter)
 
     assert varying_return_func() in [1, 2, 3]
 
 
+def test_failed_run_is_skipped_for_return_value():
+    counter = itertools.count(1)
+
+    @timeit(runs=3, workers=1)
+    def fails_on_first_call():
+        call = next(counter)
+        if call == 1:
+            raise ValueError("Intentional Error")
+        return call
+
+    assert fails_on_first_call() == 2
+
+
+def test_worker_only_sends_back_kept_results():
+    kept = _timeit_worker((sample_function, (1, 2), {}, True, False))
+    discarded = _timeit_worker((sample_function, (1, 2), {}, False, False))
+    assert kept[1] == 3
+    assert isinstance(discarded, float) and discarded > 0
+
+
+def test_worker_keeps_none_result_apart_from_discarded_runs():
+    assert _timeit_worker((time.sleep, (0,), {}, True, False))[1:] == (None,)
+    assert isinstance(_timeit_worker((time.sleep, (0,), {}, False, False)), float)
+
+
+def test_worker_only_measures_cpu_time_when_asked():
+    assert len(_timeit_worker((sample_function, (1, 2), {}, True, False))) == 2
+    assert len(_timeit_worker((sample_function, (1, 2), {}, True, True))) == 3
+
+
+def test_none_from_first_successful_run_is_returned():
+    returns = iter([None, 2, 3])
+
+    @timeit(runs=3, workers=1)
+    def returns_none_first():
+        return next(returns)
+
+    assert returns_none_first() is None
+
+
 def test_large_number_of_workers():
     @timeit(runs=2, workers=10)
     def imbalanced_workers_func():
@@ -218,6 +431,7 @@ def test_decorator_with_generator_function():
     assert next(gen) == 2
 
 
+@pytest.mark.xdist_group("multiprocessing")
 def test_cpu_bound_function_multiprocessing():
     decorated_func = timeit(runs=2, workers=2, use_multiprocessing=True)(cpu_bound_function)
     result = decorated_func(0)
@@ -225,26 +439,55 @@ def test_cpu_bound_function_multiprocessing():
 
 
 def test_io_bound_function_threading():
-    result = io_bound_function(0.1)
+    decorated_func = timeit(runs=2, workers=2)(io_bound_function)
+    result = decorated_func(0.1)
     assert result == 0.1
 
 
+@pytest.mark.xdist_group("multiprocessing")
 def test_multiprocessing_with_high_cpu_load():
     decorated_func = timeit(runs=4, workers=4, use_multiprocessing=True)(cpu_intensive_task)
     result = decorated_func()
     assert result is not None
 
 
+@pytest.mark.parametrize("cpu_time, elapsed_time, warned", [
+    (1.0, 1.0, True),
+    (0.85, 1.0, True),
+    (0.1, 1.0, False),
+    (3.5, 1.0, False),
+    (0.0, 0.0, False),
+])
+def test_gil_bound_hint(cpu_time, elapsed_time, warned, caplog):
+    with caplog.at_level(logging.WARNING, logger="timeit.decorator.wrapper"):
+        _warn_if_gil_bound(cpu_intensive_task, cpu_time, elapsed_time)
+    assert ("use_multiprocessing=True" in caplog.text) == warned
+
+
+def test_io_bound_threads_do_not_suggest_multiprocessing(caplog):
+    decorated_func = timeit(runs=2, workers=2, detailed=True)(sample_function)
+    with caplog.at_level(logging.WARNING, logger="timeit.decorator.wrapper"):
+        decorated_func(1, 2)
+    assert "use_multiprocessing=True" not in caplog.text
+
+
+def test_threading_leaves_no_threads_behind():
+    decorated_func = timeit(runs=4, workers=2)(io_bound_function)
+    decorated_func(0)
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("timeit")]
+
+
 def test_threading_with_high_io_load():
     @timeit(runs=4, workers=4)
     def io_intensive_task():
-        time.sleep(0.1)
+        _tiny_work()
         return "completed"
 
     result = io_intensive_task()
     assert result == "completed"
 
 
+@pytest.mark.xdist_group("multiprocessing")
 def test_switching_multiprocessing_mode():
     decorated_func_multiprocessing = timeit(runs=2, workers=2, use_multiprocessing=True)(task_with_multiprocessing)
     decorated_func_threading = timeit(runs=2, workers=2)(task_with_threading)
@@ -264,17 +507,26 @@ def test_static_method():
     assert SampleClass.sample_static_method(1, 2) == 3
 
 
+@pytest.mark.xdist_group("multiprocessing")
 def test_class_method():
     # Test the decorator on a class method
     assert SampleClass.sample_class_method(1, 2) == 3
 
 
+@pytest.mark.xdist_group("multiprocessing")
 def test_instance_method():
     # Test the decorator on an instance method
     instance = SampleClass()
     assert instance.sample_instance_method(1, 2) == 3
 
 
+@pytest.mark.xdist_group("multiprocessing")
+def test_instance_method_with_keyword_arguments():
+    # Keyword arguments must reach the method in the worker processes as well
+    instance = SampleClass()
+    assert instance.sample_instance_method(1, b=2) == 3
+
+
 def test_single_run():
     # Test the decorator with a single run
     decorated_func = timeit(runs=1, workers=1)(sample_function)
@@ -287,6 +539,7 @@ def test_multiple_runs():
     assert decorated_func(1, 2) == 3
 
 
+@pytest.mark.xdist_group("multiprocessing")
 def test_multiprocessing():
     # Test the decorator with multiprocessing
     decorated_func = timeit(use_multiprocessing=True, runs=2, workers=2)(sample_function)
@@ -1,44 +1,231 @@
+import array
+import contextlib
+import itertools
+import json
 import multiprocessing
+import sys
 import threading
 import time
 import logging
-from functools import wraps
+import math
+from functools import lru_cache, wraps
 from concurrent.futures import ThreadPoolExecutor
-from multiprocessing import Pool
-from statistics import mean, median, stdev
-from typing import Optional, Callable
-from tabulate import tabulate
+from multiprocessing.pool import Pool
+from typing import Optional, Callable, Literal, NamedTuple, Sequence
 
 
-def _multiprocessing_instance_method_call(instance, method_name, *args, **kwargs):
-    method = getattr(instance, method_name)
-    return method(*args, **kwargs)
+_ROOT_LOGGER = logging.getLogger()
+_DECORATOR_LOGGER = logging.getLogger("timeit.decorator")
+_WRAPPER_LOGGER = logging.getLogger("timeit.decorator.wrapper")
+_WORKER_LOGGER = logging.getLogger("timeit.decorator._timeit_worker")
 
+_MAIN_THREAD_ID = threading.main_thread().ident
 
-def _timeit_worker(args):
+
+def _create_pool(workers: int, mp_context: Optional[str] = None) -> Pool:
+    """
+    Start a process pool of the given size and start method for a single call.
+
+    Pools are not reused: forked workers keep a snapshot of the parent, so a pool kept across calls
+    would run with stale globals and could not find functions defined after it was started.
+    """
+    if mp_context is not None:
+        return multiprocessing.get_context(mp_context).Pool(workers)
+    if sys.platform.startswith("linux") and multiprocessing.get_start_method(allow_none=True) is None:
+        # fork starts workers without re-importing the caller's modules. It is only safe to rely on it on Linux,
+        # macOS defaults to spawn because some system frameworks break in forked children.
+        return multiprocessing.get_context("fork").Pool(workers)
+    # Follows the start method chosen with multiprocessing.set_start_method(), or the platform default.
+    # The default context is only resolved here, so that importing this module does not fix it.
+    return multiprocessing.Pool(workers)
+
+
+_format_seconds = "{:.6f}s".format
+_HEADER_LABELS = ("Function", "Args", "Kwargs", "Runs", "Workers")
+# In the order of the _Summary fields
+_RUN_STATS_LABELS = ("Average Time", "Median Time", "Min Time", "Max Time", "Std Deviation", "Total Time")
+
+
+def _build_stats_table(func: Callable, args: tuple, kwargs: dict, runs: int, workers: int, stats: dict) -> str:
+    """
+    Render the detailed report for one measurement.
+
+    :param stats: Mapping of row label to a duration in seconds, in display order.
+    """
+    # Imported here so that programs which never ask for a detailed report don't pay for it
+    from tabulate import tabulate
+
+    stats_data = list(zip(_HEADER_LABELS, (func, args[1:], kwargs, runs, workers)))
+    stats_data.extend((label, _format_seconds(value)) for label, value in stats.items())
+    stats_data.append(("", ""))
+    return tabulate(stats_data, tablefmt="plain")
+
+
+def _build_stats_json(func: Callable, args: tuple, kwargs: dict, runs: int, workers: int, stats: dict) -> str:
+    """
+    Render the report for one measurement as a single JSON object.
+
+    :param args: Positional arguments to report, without the instance or class of a method call.
+    :param stats: Mapping of row label to a duration in seconds, in display order.
+    """
+    record = {
+        "function": func.__qualname__,
+        "args": args,
+        "kwargs": kwargs,
+        "runs": runs,
+        "workers": workers,
+    }
+    record.update((label.lower().replace(" ", "_"), value) for label, value in stats.items())
+    return json.dumps(record, default=repr)
+
+
+def _report_enabled(log_level: Optional[int]) -> bool:
+    """
+    Tell whether a report at ``log_level`` will be emitted, raising the root logger to that level first.
+
+    ``setLevel`` clears the cache of every logger, so it is only called when the level actually changes.
+    """
+    if log_level is None:
+        return True
+    if _ROOT_LOGGER.level != log_level:
+        _ROOT_LOGGER.setLevel(log_level)
+    return _ROOT_LOGGER.isEnabledFor(log_level)
+
+
+_NUMPY_MIN_RUNS = 64
+
+
+class _Summary(NamedTuple):
+    avg_time: float
+    med_time: float
+    min_time: float
+    max_time: float
+    std_dev: float
+    total_time: float
+
+
+@lru_cache(maxsize=None)
+def _import_numpy():
+    """Return the numpy module, or None when it is not installed."""
     try:
-        start_time = time.time()
-        if isinstance(args[0], tuple) and hasattr(args[0][0], args[0][1]):
-            # Instance method call
-            instance, method_name, *method_args = args[0]
-            func_result = _multiprocessing_instance_method_call(instance, method_name, *method_args)
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _summarize(times: Sequence[float]) -> _Summary:
+    """
+    Compute the average, median, min, max, standard deviation and total of ``times``.
+
+    From ``_NUMPY_MIN_RUNS`` values on, the reductions are delegated to numpy when it is installed.
+    Otherwise everything but the median is accumulated in a single pass, using Welford's algorithm
+    for a numerically stable sample standard deviation.
+    """
+    if len(times) >= _NUMPY_MIN_RUNS:
+        np = _import_numpy()
+        if np is not None:
+            # Reads an array.array('d') through the buffer protocol instead of converting each float
+            values = np.asarray(times, dtype=np.float64)
+            count = len(values)
+            total_time = float(values.sum())
+            middle = count // 2
+            # Quickselect the middle values into place rather than sorting, without np.median's extra passes
+            partitioned = np.partition(values, (middle - 1, middle))
+            med_time = float(partitioned[middle]) if count % 2 else float(partitioned[middle - 1:middle + 1].mean())
+            return _Summary(
+                total_time / count,
+                med_time,
+                float(values.min()),
+                float(values.max()),
+                float(values.std(ddof=1)),
+                total_time,
+            )
+
+    count = 0
+    total_time = 0.0
+    avg_time = 0.0
+    squared_deviations = 0.0
+    min_time = math.inf
+    max_time = -math.inf
+    for value in times:
+        count += 1
+        total_time += value
+        if value < min_time:
+            min_time = value
+        if value > max_time:
+            max_time = value
+        delta = value - avg_time
+        avg_time += delta / count
+        squared_deviations += delta * (value - avg_time)
+
+    std_dev = math.sqrt(squared_deviations / (count - 1)) if count > 1 else 0
+    ordered = sorted(times)
+    middle = count // 2
+    med_time = ordered[middle] if count % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+    return _Summary(avg_time, med_time, min_time, max_time, std_dev, total_time)
+
+
+def _warn_if_gil_bound(func: Callable, cpu_time: float, elapsed_time: float):
+    """
+    Suggest multiprocessing when threaded runs were CPU-bound and could only execute one at a time.
+
+    Threads that hold the GIL add up to about one second of CPU time per elapsed second, whatever the
+    number of workers. I/O-bound runs use much less, and code that releases the GIL uses more.
+    """
+    if elapsed_time > 0 and 0.8 <= cpu_time / elapsed_time < 1.5:
+        _WRAPPER_LOGGER.warning(
+            "%s appears to be CPU-bound, consider use_multiprocessing=True", func.__qualname__
+        )
+
+
+def _timeit_worker(worker_args, _perf_counter_ns=time.perf_counter_ns, _thread_time_ns=time.thread_time_ns):
+    """
+    Time one run of the call described by ``worker_args``.
+
+    Return ``(duration, result)``, followed by the CPU time of the run when ``measure_cpu`` is set. Runs that
+    do not keep their result only return their duration as a float, so they can't be mistaken for a run that
+    returned None. Return None if the function raised.
+    """
+    # The clocks are bound as defaults so that reading them right around the call is a local lookup
+    try:
+        if isinstance(worker_args[1], str):
+            # Instance method call, looked up by name so that only the instance has to be pickled
+            instance, method_name, func_args, func_kwargs, keep_result, measure_cpu = worker_args
+            func = getattr(instance, method_name)
         else:
             # Regular function call
-            func, args, kwargs = args
-            func_result = func(*args, **kwargs)
-        end_time = time.time()
-        return end_time - start_time, func_result
+            func, func_args, func_kwargs, keep_result, measure_cpu = worker_args
+        if measure_cpu:
+            cpu_start_time = _thread_time_ns()
+        start_time = _perf_counter_ns()
+        func_result = func(*func_args, **func_kwargs)
+        end_time = _perf_counter_ns()
+        if not keep_result:
+            # The caller only needs this run's duration, don't send the value back through the pipe
+            return (end_time - start_time) / 1e9
+        if measure_cpu:
+            # Only requested when the CPU time feeds _warn_if_gil_bound
+            return (end_time - start_time) / 1e9, func_result, (_thread_time_ns() - cpu_start_time) / 1e9
+        return (end_time - start_time) / 1e9, func_result
     except Exception as e:
-        print(f"Error in _timeit_worker: {e}")
+        _WORKER_LOGGER.error("Error in _timeit_worker: %s", e)
         return None
 
 
+def _timeit_chunk(worker_args, count: int) -> list:
+    """Execute ``count`` runs one after the other, so that a single thread pool task covers several runs."""
+    return [_timeit_worker(worker_args) for _ in range(count)]
+
+
 def timeit(
         runs: int = 1,
         workers: int = 1,
         log_level: Optional[int] = logging.INFO,
         use_multiprocessing: bool = False,
-        detailed: bool = False
+        detailed: bool = False,
+        log_format: Literal["plain", "json"] = "plain",
+        mp_context: Optional[str] = None
 ):
     """
     Time the execution of a function with options for multiple runs and workers.
@@ -58,9 +245,20 @@ def timeit(
     :type use_multiprocessing: bool
     :param detailed: get a detailed output with different stats about the execution time.
     :type detailed: bool
-    :return: The return value of the function from its first execution.
+    :param log_format: "plain" for human readable output, or "json" to emit every statistic as a
+                       single JSON object per call. ``detailed`` only affects the plain format.
+    :type log_format: str
+    :param mp_context: Start method of the worker processes ("fork", "spawn" or "forkserver") when
+                       use_multiprocessing is True. Defaults to the start method set with
+                       multiprocessing.set_start_method(), or to fork on Linux and the platform's
+                       default elsewhere when none was set.
+    :type mp_context: Optional[str]
+    :return: The return value of the function from its first successful execution. With multiprocessing,
+             only the first run sends its return value back to this process, so this is None if that
+             run failed.
     :rtype: Any
-    :raises ValueError: If 'runs' or 'workers' are set to less than 1.
+    :raises ValueError: If 'runs' or 'workers' are set to less than 1, or if 'log_format' or 'mp_context'
+                        is unknown.
 
     For I/O-bound tasks (like file operations, network calls), threading is generally
     more efficient due to lower overhead and the GIL's release during I/O operations.
@@ -82,115 +280,160 @@ def timeit(
     """
 
     def decorator(func: Callable):
-        decorator_logger = logging.getLogger("timeit.decorator")
-        decorator_logger.debug(f"Decorating function: {func.__name__}")
+        _DECORATOR_LOGGER.debug("Decorating function: %s", func.__name__)
         method_name = func.__name__
+        # Only functions defined in a class body can be methods, so plain functions skip the per-call hasattr below
+        defined_in_class = "." in func.__qualname__.rsplit("<locals>.", 1)[-1]
+
+        def is_method_call(args: tuple) -> bool:
+            return defined_in_class and bool(args) and hasattr(args[0], method_name)
+
+        # A single run never needs a pool, whatever the number of workers
+        single_run = runs == 1
+        # CPU time is only collected when it feeds the GIL hint of the detailed threading report
+        check_gil = detailed and log_format == "plain" and not use_multiprocessing and workers > 1
+        # The arguments are validated once here, but the error is still raised when the function is called
+        if runs < 1 or workers < 1:
+            config_error = "Both runs and workers must be at least 1"
+        elif log_format not in ("plain", "json"):
+            config_error = f"Unknown log_format: {log_format!r}, expected 'plain' or 'json'"
+        elif mp_context is not None and mp_context not in multiprocessing.get_all_start_methods():
+            start_methods = multiprocessing.get_all_start_methods()
+            config_error = f"Unknown mp_context: {mp_context!r}, expected one of {start_methods}"
+        else:
+            config_error = None
 
         @wraps(func)
         def wrapper(*args, **kwargs):
-            wrapper_logger = logging.getLogger("timeit.decorator.wrapper")
-            wrapper_logger.debug(f"Calling function: {func.__name__}")
+            _WRAPPER_LOGGER.debug("Calling function: %s", func.__name__)
 
-            # Check if the current thread is the main thread
-            if threading.current_thread() is not threading.main_thread():
-                # This is a worker thread, execute the function directly
+            # Check if we are in the main thread, outside of a multiprocessing worker. Processes forked
+            # directly with os.fork() (pre-fork servers) have no parent process and keep reporting.
+            if threading.get_ident() != _MAIN_THREAD_ID or multiprocessing.parent_process() is not None:
+                # This is a worker thread or a child process, execute the function directly
                 return func(*args, **kwargs)
 
-            # Check if the current process is the main process
-            if multiprocessing.current_process().name != 'MainProcess':
-                # This is a child process, execute the function directly
-                return func(*args, **kwargs)
+            if config_error is not None:
+                raise ValueError(config_error)
 
-            if runs < 1 or workers < 1:
-                raise ValueError("Both runs and workers must be at least 1")
+            if single_run:
+                # Directly execute the function if only a single run
+                if not _report_enabled(log_level):
+                    # The measurement would be discarded, don't bother timing the call
+                    return func(*args, **kwargs)
 
-            if (runs == 1 and workers == 1) or (runs == 1 and workers > runs):
-                # Directly execute the function if only a single run with one worker
-                start_time = time.time()
+                start_time = time.perf_counter_ns()
                 result = func(*args, **kwargs)
-                end_time = time.time()
-                execution_time = end_time - start_time
-
-                stats_data = [
-                    ["Function", func],
-                    ["Args", args[1:]],
-                    ["Kwargs", kwargs],
-                    ["Runs", runs],
-                    ["Workers", workers],
-                    ["Execution Time", f"{execution_time}s"],
-                    ["", ""],
-                ]
-
-                if detailed:
-                    output = tabulate(stats_data, tablefmt="plain")
+                end_time = time.perf_counter_ns()
+                execution_time = (end_time - start_time) / 1e9
+
+                stats = {"Execution Time": execution_time}
+                if log_format == "json":
+                    reported_args = args[1:] if is_method_call(args) else args
+                    output = _build_stats_json(func, reported_args, kwargs, runs, workers, stats)
+                elif detailed:
+                    output = _build_stats_table(func, args, kwargs, runs, workers, stats)
                 else:
                     output = f"{func}: Exec: {execution_time}s"
 
                 if log_level is not None:
-                    logger = logging.getLogger()
-                    logger.setLevel(log_level)
-                    logger.log(log_level, output)
+                    _ROOT_LOGGER.log(log_level, output)
                 else:
                     print(output)
                 return result
 
-            is_instance_method = hasattr(args[0], method_name) if args else False
-            if is_instance_method:
-                worker_args = [((args[0], method_name) + args[1:], {},) for _ in range(runs)]
-            else:
-                worker_args = [(func, args, kwargs) for _ in range(runs)]
-
-            if use_multiprocessing:
-                wrapper_logger.debug("Starting multiprocessing tasks")
-                with Pool(workers) as pool:
-                    results = pool.map(_timeit_worker, worker_args)
-                wrapper_logger.debug("Completed multiprocessing tasks")
+            # Pools only live for the duration of the call and are shut down once the results are consumed
+            pool = contextlib.nullcontext()
+            batch_start_time = time.perf_counter_ns()
+            if workers == 1:
+                # A single worker would execute the runs one after the other anyway, so run them
+                # in this thread and skip the pool hand-offs (and pickling, with multiprocessing)
+                task_kind = "sequential"
+                sequential_args = (func, args, kwargs, True, False)
+                results = (_timeit_worker(sequential_args) for _ in range(runs))
             else:
-                wrapper_logger.debug("Starting threading tasks")
-                with ThreadPoolExecutor(max_workers=workers) as executor:
-                    results = list(executor.map(_timeit_worker, worker_args))
-                wrapper_logger.debug("Completed threading tasks")
-
-            times = [result[0] for result in results if result is not None]
+                is_instance_method = is_method_call(args)
+                # Every run receives the same arguments and the workers never mutate them, so one tuple is
+                # repeated lazily instead of building a list of runs entries
+                if is_instance_method:
+                    call = (args[0], method_name, args[1:], kwargs)
+                else:
+                    call = (func, args, kwargs)
+
+                # Same heuristic as Pool.map: around four chunks per worker keeps the number of hand-offs
+                # low while still spreading uneven run times across the workers
+                chunksize = max(1, runs // (workers * 4))
+
+                if use_multiprocessing:
+                    task_kind = "multiprocessing"
+                    # Results are pickled back from the child processes, only the first run returns its value
+                    worker_args = itertools.chain(
+                        (call + (True, False),), itertools.repeat(call + (False, False), runs - 1)
+                    )
+                    pool = _create_pool(workers, mp_context)
+                    results = pool.imap_unordered(_timeit_worker, worker_args, chunksize)
+                else:
+                    task_kind = "threading"
+                    # Executor.map creates a future per item, so submit chunks of runs rather than single runs
+                    full_chunks, remainder = divmod(runs, chunksize)
+                    chunk_sizes = itertools.repeat(chunksize, full_chunks)
+                    if remainder:
+                        chunk_sizes = itertools.chain(chunk_sizes, (remainder,))
+                    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="timeit")
+                    chunks = pool.map(_timeit_chunk, itertools.repeat(call + (True, check_gil)), chunk_sizes)
+                    results = itertools.chain.from_iterable(chunks)
+            _WRAPPER_LOGGER.debug("Starting %s tasks", task_kind)
+
+            # Runs are aggregated as they complete, without keeping their results around.
+            # Times are stored as C doubles rather than a list of float objects.
+            times = array.array("d")
+            append_time = times.append
+            cpu_time = 0.0
+            first_result = None
+            have_result = False
+            with pool:
+                for result in results:
+                    if result is None:
+                        # The run raised, _timeit_worker already logged the error
+                        continue
+                    if isinstance(result, float):
+                        # A run that did not send its return value back, only its duration
+                        append_time(result)
+                        continue
+                    if not have_result:
+                        # Return the value of the first execution that did not fail, even when it is None
+                        have_result = True
+                        first_result = result[1]
+                    append_time(result[0])
+                    if check_gil:
+                        cpu_time += result[2]
+            batch_time = (time.perf_counter_ns() - batch_start_time) / 1e9
+            _WRAPPER_LOGGER.debug("Completed %s tasks", task_kind)
             if not times:
                 raise RuntimeError("No valid results were returned from the timed function.")
 
-            avg_time = mean(times)
-            med_time = median(times)
-            min_time = min(times)
-            max_time = max(times)
-            std_dev = stdev(times) if len(times) > 1 else 0
-            total_time = sum(times)
-
-            stats_data = [
-                ["Function", func],
-                ["Args", args[1:]],
-                ["Kwargs", kwargs],
-                ["Runs", runs],
-                ["Workers", workers],
-                ["Average Time", f"{avg_time}s"],
-                ["Median Time", f"{med_time}s"],
-                ["Min Time", f"{min_time}s"],
-                ["Max Time", f"{max_time}s"],
-                ["Std Deviation", f"{std_dev}s"],
-                ["Total Time", f"{total_time}s"],
-                ["", ""],
-            ]
-
-            if detailed:
-                output = tabulate(stats_data, tablefmt="plain")
+            if not _report_enabled(log_level):
+                # The record would be discarded, skip the statistics and the formatting
+                return first_result
+
+            summary = _summarize(times)
+            stats = dict(zip(_RUN_STATS_LABELS, summary))
+            if log_format == "json":
+                reported_args = args[1:] if is_method_call(args) else args
+                output = _build_stats_json(func, reported_args, kwargs, runs, workers, stats)
+            elif detailed:
+                output = _build_stats_table(func, args, kwargs, runs, workers, stats)
+                if check_gil:
+                    _warn_if_gil_bound(func, cpu_time, batch_time)
             else:
-                output = f"{func}: Avg: {avg_time:.3f}s, Med: {med_time:.3f}s"
+                output = f"{func}: Avg: {summary.avg_time:.3f}s, Med: {summary.med_time:.3f}s"
 
             if log_level is not None:
-                logger = logging.getLogger()
-                logger.setLevel(log_level)
-                logger.log(log_level, output)
+                _ROOT_LOGGER.log(log_level, output)
             else:
                 print(output)
 
-            # Return the result of the first execution
-            return results[0][1] if results else None
+            return first_result
 
         return wrapper
 